@@ -15,8 +15,20 @@ You should have received a copy of the JXW license with
 this file. If not, please write to: josephchenhk@gmail.com
 """
 
+import threading
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Any, Iterable
+
+# numeric columns of AccountBalance that are persisted in the `balance` table
+_DB_COLUMNS = (
+    "cash",
+    "available_cash",
+    "max_power_short",
+    "net_cash_power",
+    "maintenance_margin",
+    "unrealized_pnl",
+    "realized_pnl",
+)
 
 
 @dataclass
@@ -30,3 +42,45 @@ class AccountBalance:
     maintenance_margin: float = None           # MaintMarginReq(HKD)
     unrealized_pnl: float = 0.0                # UnrealizedPnL(HKD)
     realized_pnl: float = 0.0                  # RealizedPnL(HKD)
+
+    def __setattr__(self, name: str, value: Any):
+        changed = (
+            not name.startswith("_")
+            and self.__dict__.get(name, value) != value)
+        super().__setattr__(name, value)
+        if changed and getattr(self, "_updated", None) is not None:
+            self._updated.set()
+
+    def __getstate__(self):
+        # threading.Event can not be pickled (nor copied)
+        state = self.__dict__.copy()
+        state.pop("_updated", None)
+        return state
+
+    def bind_updated_event(self, updated: threading.Event):
+        """`updated` will be set whenever a field is changed"""
+        self._updated = updated
+
+    def diff(
+            self,
+            shadow: Dict[str, Any],
+            columns: Iterable[str] = None
+    ) -> Dict[str, Any]:
+        """Return the columns (with current values) that differ from
+        `shadow`, e.g. an in-memory copy of the balance last written to DB,
+        so that unchanged balances need neither a SELECT nor an UPDATE.
+
+        By default the numeric columns persisted in the `balance` table are
+        compared; `None` values are skipped, so the result can be passed to
+        `db.update_records(columns=...)` as is.
+        """
+        if columns is None:
+            columns = _DB_COLUMNS
+        updates = dict()
+        for col in columns:
+            value = getattr(self, col)
+            if value is None:
+                continue
+            if col not in shadow or shadow[col] != value:
+                updates[col] = value
+        return updates
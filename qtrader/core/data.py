@@ -16,13 +16,13 @@ this file. If not, please write to: josephchenhk@gmail.com
 """
 
 import os
-import importlib
 import warnings
 from dataclasses import dataclass
 from datetime import datetime
 from datetime import time as Time
 from datetime import date as Date
 from datetime import timedelta
+from functools import lru_cache
 from typing import List, Any
 import pandas as pd
 
@@ -159,6 +159,13 @@ class Quote:
     sec_status: str = "NORMAL"
 
 
+# Data models that can be referred to by class name in `DATA_MODEL`,
+# resolved once instead of on every data query
+_DATA_CLASSES = {
+    cls.__name__: cls for cls in (Bar, CapitalDistribution, OrderBook, Quote)
+}
+
+
 def _get_data_path(security: Security, dtype: str, **kwargs) -> str:
     """Get the path to corresponding csv files."""
     if dtype == "kline":
@@ -190,6 +197,28 @@ def _get_data_files(security: Security, dtype: str, **kwargs) -> List[str]:
     return data_files
 
 
+@lru_cache(maxsize=128)
+def _read_csv(data_file: str, mtime: float) -> pd.DataFrame:
+    """Read csv file; `mtime` is part of the cache key so that a file is
+    re-read once it has been modified"""
+    if 'open' in read_row_from_csv(data_file, 1):
+        return pd.read_csv(data_file)
+    elif 'open' in read_row_from_csv(data_file, 2):
+        data = pd.read_csv(data_file, header=[0, 1], index_col=[0])
+        # get only the principal contract
+        levels = [lvl for lvl in set(data.columns.get_level_values(0)) if lvl != 'meta']
+        volumes = {lvl: data.xs(lvl, level=0, axis=1).dropna()['volume'].sum() for lvl in levels}
+        principal_level = max(volumes, key=volumes.get)
+        return data.xs(principal_level, level=0, axis=1).reset_index()
+    raise ValueError(f"Column `open` was NOT found in header of {data_file}!")
+
+
+def _read_data_file(data_file: str) -> pd.DataFrame:
+    """Read csv data file (cached, the returned DataFrame is shared and must
+    NOT be modified in place)"""
+    return _read_csv(data_file, os.path.getmtime(data_file))
+
+
 def _get_data(
         security: Stock,
         start: datetime,
@@ -212,17 +241,9 @@ def _get_data(
                 data_files_in_range.append(data_file)
         # Aggregate the data to a dataframe
         full_data = pd.DataFrame()
+        data_path = _get_data_path(security, dtype)
         for data_file in sorted(data_files_in_range):
-            data_path = _get_data_path(security, dtype)
-            if 'open' in read_row_from_csv(f"{data_path}/{data_file}", 1):
-                data = pd.read_csv(f"{data_path}/{data_file}")
-            elif 'open' in read_row_from_csv(f"{data_path}/{data_file}", 2):
-                data = pd.read_csv(f"{data_path}/{data_file}", header=[0,1], index_col=[0])
-                # get only the principal contract
-                levels = [lvl for lvl in set(data.columns.get_level_values(0)) if lvl!='meta']
-                volumes = {lvl: data.xs(lvl, level=0, axis=1).dropna()['volume'].sum() for lvl in levels}
-                principal_level = max(volumes, key=volumes.get)
-                data = data.xs(principal_level, level=0, axis=1).reset_index()
+            data = _read_data_file(f"{data_path}/{data_file}")
             # # Confirm the time column could be parsed into datetime
             # try:
             #     datetime.strptime(data.iloc[0][time_col], "%Y-%m-%d %H:%M:%S")
@@ -247,16 +268,8 @@ def _get_data(
         full_data.reset_index(drop=True, inplace=True)
     elif kwargs.get('interval') == '1day':
         data_path = _get_data_path(security, dtype, interval='1day')
-        if 'open' in read_row_from_csv(f"{data_path}/ohlcv.csv", 1):
-            data = pd.read_csv(f"{data_path}/ohlcv.csv")
-        elif 'open' in read_row_from_csv(f"{data_path}/ohlcv.csv", 2):
-            data = pd.read_csv(f"{data_path}/ohlcv.csv", header=[0, 1], index_col=[0])
-            # get only the principal contract
-            levels = [lvl for lvl in set(data.columns.get_level_values(0)) if lvl != 'meta']
-            volumes = {lvl: data.xs(lvl, level=0, axis=1).dropna()['volume'].sum() for lvl in levels}
-            principal_level = max(volumes, key=volumes.get)
-            data = data.xs(principal_level, level=0, axis=1).reset_index()
-        full_data = data
+        data = _read_data_file(f"{data_path}/ohlcv.csv")
+        full_data = data.copy()
         full_data['time_key'] = pd.to_datetime(data['time_key'])
 
     # build continuous contracts for futures
@@ -303,20 +316,19 @@ def _get_data(
                     switch_rows.extend([i-1, i])
             roll = full_data.loc[switch_rows]
         assert roll.shape[0] % 2 == 0, 'roll records should be an even number'
-        # get adjustment factors and corresponding indices
+        # get adjustment factors and corresponding indices (close prices and
+        # index are extracted once, instead of slicing a row per lookup)
         adj_factors = []
         adj_indices = []
+        roll_close = roll['close'].tolist() if len(roll) > 0 else []
         for i in range(1, len(roll), 2):
-            factor = roll.iloc[i]['close'] / roll.iloc[i - 1]['close']
+            factor = roll_close[i] / roll_close[i - 1]
             adj_factors.append(factor)
-            adj_indices.append(roll.iloc[[i-1]].index[0])
+            adj_indices.append(roll.index[i - 1])
         # Adjust historical prices and make continuous data
         for idx, factor in zip(adj_indices, adj_factors):
             # print(idx, factor)
-            full_data.loc[:idx, 'close'] *= factor
-            full_data.loc[:idx, 'open'] *= factor
-            full_data.loc[:idx, 'high'] *= factor
-            full_data.loc[:idx, 'low'] *= factor
+            full_data.loc[:idx, ['close', 'open', 'high', 'low']] *= factor
     return full_data
 
 
@@ -327,20 +339,21 @@ def _get_data_iterator(
 ) -> Any:
     """Data generator"""
     # `class_name` could be Bar, CapitalDistribution, Quote, Orderbook, etc
-    data_cls = getattr(importlib.import_module(
-        "qtrader.core.data"), class_name)
+    data_cls = _DATA_CLASSES[class_name]
     time_col = full_data.columns[0]
     assert "time" in time_col or "Time" in time_col, (
         "The first column in `full_data` must be a `*time*` column, but "
         f"{time_col} was given."
     )
-    for _, row in full_data.iterrows():
-        cur_time = row[time_col].to_pydatetime()
-        kwargs = {"datetime": cur_time, "security": security}
-        for col in full_data.columns:
-            if col == time_col:
-                continue
-            kwargs[col] = row[col]
+    # Extract columns as lists once, rather than boxing every row into a
+    # Series (as `iterrows` does)
+    data_cols = [col for col in full_data.columns if col != time_col]
+    time_arr = pd.DatetimeIndex(full_data[time_col]).to_pydatetime()
+    data_arrs = [full_data[col].tolist() for col in data_cols]
+    for i in range(len(full_data)):
+        kwargs = {"datetime": time_arr[i], "security": security}
+        for col, arr in zip(data_cols, data_arrs):
+            kwargs[col] = arr[i]
         data = data_cls(**kwargs)
         yield data
 
@@ -36,13 +36,55 @@ class Portfolio:
             account_balance: AccountBalance,
             position: Position,
             market: BaseGateway,
-            reporting_currency: str = ''
+            reporting_currency: str = '',
+            updated: threading.Event = None
     ):
+        # set whenever balance or position changes, so that persistence can
+        # wait on it instead of polling; pass in the same event to several
+        # portfolios to wait on all of them at once
+        if updated is None:
+            updated = threading.Event()
+        self.updated = updated
         self.account_balance = account_balance
         self.position = position
         self.market = market
         self.reporting_currency = reporting_currency
 
+    def __getstate__(self):
+        # threading.Event can not be pickled (nor copied)
+        state = self.__dict__.copy()
+        state.pop("updated", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.updated = threading.Event()
+        # rebind copied balance/position (a shallow copy shares them with
+        # the original portfolio, which keeps its own event)
+        for obj in (self._account_balance, self._position):
+            if getattr(obj, "_updated", None) is None:
+                obj.bind_updated_event(self.updated)
+
+    @property
+    def account_balance(self) -> AccountBalance:
+        return self._account_balance
+
+    @account_balance.setter
+    def account_balance(self, account_balance: AccountBalance):
+        account_balance.bind_updated_event(self.updated)
+        self._account_balance = account_balance
+        self.updated.set()
+
+    @property
+    def position(self) -> Position:
+        return self._position
+
+    @position.setter
+    def position(self, position: Position):
+        position.bind_updated_event(self.updated)
+        self._position = position
+        self.updated.set()
+
     def update(self, deal: Deal):
         with lock:
             security = deal.security
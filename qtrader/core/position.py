@@ -18,7 +18,7 @@ import threading
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, FrozenSet, Tuple
 
 from qtrader.core.constants import Direction, Offset
 from qtrader.core.security import Stock
@@ -43,6 +43,17 @@ class Position:
         if holdings is None:
             holdings = dict()
         self.holdings = holdings
+        self._updated = None
+
+    def __getstate__(self):
+        # threading.Event can not be pickled (nor copied)
+        state = self.__dict__.copy()
+        state.pop("_updated", None)
+        return state
+
+    def bind_updated_event(self, updated: threading.Event):
+        """`updated` will be set whenever holdings are changed"""
+        self._updated = updated
 
     def update(self, position_data: PositionData, offset: Offset):
         with lock:
@@ -96,6 +107,8 @@ class Position:
                     self.holdings[security].pop(offset_direction, None)
             if len(self.holdings[security]) == 0:
                 self.holdings.pop(security, None)
+            if getattr(self, "_updated", None) is not None:
+                self._updated.set()
 
     def get_position(
             self,
@@ -117,6 +130,16 @@ class Position:
                 positions.append(self.holdings[security][Direction.SHORT])
         return positions
 
+    def snapshot(self) -> FrozenSet[Tuple[str, Direction, int, float]]:
+        """Hashable summary of current holdings, used to tell whether
+        positions have changed since they were last persisted"""
+        with lock:
+            return frozenset(
+                (security.code, direction, data.quantity, data.holding_price)
+                for security in self.holdings
+                for direction, data in self.holdings[security].items()
+            )
+
     def __str__(self):
         position_str = "Position(\n"
         for security in self.holdings:
@@ -15,6 +15,7 @@ You should have received a copy of the JXW license with
 this file. If not, please write to: josephchenhk@gmail.com
 """
 import csv
+from collections import OrderedDict
 from functools import wraps
 from timeit import default_timer as timer
 from datetime import datetime
@@ -143,6 +144,91 @@ def safe_call(func):
     return wrapper
 
 
+def ttl_cache(ttl: float, maxsize: int = 4096):
+    """Cache results of a method for `ttl` seconds (least recently used
+    entries are evicted beyond `maxsize`).
+
+    The cache is kept on the instance, so it is released together with the
+    instance and `method.cache_clear(instance)` only clears that instance.
+    Pass `use_cache=False` to the decorated method to bypass (and refresh)
+    the cache. `None` results are not cached.
+
+    Note: arguments are keyed as passed, without binding them to the
+    signature, so `f(sec)` and `f(security=sec)` are cached separately;
+    call the method consistently to get cache hits.
+    """
+
+    def decorator(func):
+        attr = f"_ttl_cache_{func.__name__}"
+        init_lock = threading.Lock()
+
+        def get_cache(instance):
+            cache = instance.__dict__.get(attr)
+            if cache is None:
+                with init_lock:
+                    cache = instance.__dict__.get(attr)
+                    if cache is None:
+                        cache = (OrderedDict(), threading.Lock())
+                        instance.__dict__[attr] = cache
+            return cache
+
+        @wraps(func)
+        def wrapper(self, *args, use_cache: bool = True, **kwargs):
+            cache, cache_lock = get_cache(self)
+            key = (args, tuple(sorted(kwargs.items())))
+            now = timer()
+            if use_cache:
+                with cache_lock:
+                    item = cache.get(key)
+                    if item is not None and now - item[0] < ttl:
+                        cache.move_to_end(key)
+                        return item[1]
+            res = func(self, *args, **kwargs)
+            if res is not None:
+                with cache_lock:
+                    cache[key] = (now, res)
+                    cache.move_to_end(key)
+                    while len(cache) > maxsize:
+                        cache.popitem(last=False)
+            return res
+
+        def cache_clear(instance):
+            cache, cache_lock = get_cache(instance)
+            with cache_lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+def parse_datetime_str(text: str) -> datetime:
+    """Parse a datetime string in the fixed format "%Y-%m-%d %H:%M:%S".
+
+    This is much faster than `datetime.strptime`, which goes through the
+    regex machinery of `_strptime` on every call.
+    """
+    if (
+            len(text) != 19
+            or text[4] != "-"
+            or text[7] != "-"
+            or text[10] != " "
+            or text[13] != ":"
+            or text[16] != ":"
+    ):
+        raise ValueError(
+            f"{text} does not match format '%Y-%m-%d %H:%M:%S'")
+    parts = (
+        text[0:4], text[5:7], text[8:10], text[11:13], text[14:16],
+        text[17:19])
+    # int() would also accept spaces, signs and non-ASCII digits
+    for part in parts:
+        if not (part.isascii() and part.isdigit()):
+            raise ValueError(
+                f"{text} does not match format '%Y-%m-%d %H:%M:%S'")
+    return datetime(*map(int, parts))
+
+
 def try_parsing_datetime(
         text: str,
         default: datetime = None
@@ -150,6 +236,10 @@ def try_parsing_datetime(
     """Parsing different datetime format string, if can not be parsed, return
     the default datetime(default is set to now).
     """
+    try:
+        return parse_datetime_str(text)
+    except (TypeError, ValueError):
+        pass
     dt_formats = (
         "%Y-%m-%d %H:%M:%S.%f",
         "%Y-%m-%d %H:%M:%S",
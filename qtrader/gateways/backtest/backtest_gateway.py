@@ -312,11 +312,13 @@ class BacktestGateway(BaseGateway):
             cur_datetime: datetime,
             **kwargs
     ) -> Dict or Bar or CapitalDistribution:
-        """Get recent data"""
+        """Get recent data; `use_cache` is accepted (and ignored, as nothing
+        is cached here) for compatibility with FutuGateway"""
         assert cur_datetime >= self.market_datetime, (
             f"Current datetime {cur_datetime} is earlier than "
             f"market datetime {self.market_datetime}."
         )
+        kwargs.pop("use_cache", None)
         if kwargs:
             assert "dfield" in kwargs, (
                 f"`dfield` should be passed in as kwargs, but kwargs={kwargs}"
@@ -505,12 +507,12 @@ class BacktestGateway(BaseGateway):
             raise ValueError(
                 f'There is not enough historical data for periods={periods}, only {df.shape[0]} is available.')
         bars = []
-        for _, row in df.iterrows():
+        for row in df.itertuples(index=False):
             bar_datetime = row.time_key.to_pydatetime()
             additional_info = {}
             for fld in ('num_trds', 'value', 'ticker'):
-                if row.get(fld):
-                    additional_info[fld] = row.get(fld)
+                if getattr(row, fld, None):
+                    additional_info[fld] = getattr(row, fld)
             bar = Bar(
                 security=security,
                 datetime=bar_datetime,
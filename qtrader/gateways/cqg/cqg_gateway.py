@@ -257,7 +257,10 @@ class CqgGateway(BaseGateway):
             security: Stock,
             **kwargs
     ) -> Dict or Bar or CapitalDistribution:
-        """Get recent data (OHLCV or CapitalDistribution)"""
+        """Get recent data (OHLCV or CapitalDistribution); `use_cache` is
+        accepted (and ignored, as nothing is cached here) for compatibility
+        with FutuGateway"""
+        kwargs.pop("use_cache", None)
         if kwargs:
             assert "dfield" in kwargs, (
                 f"`dfield` should be passed in as kwargs, but kwargs={kwargs}"
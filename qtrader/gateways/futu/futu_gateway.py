@@ -53,6 +53,8 @@ from qtrader.core.position import PositionData
 from qtrader.core.security import Stock, Security, Futures
 from qtrader.core.data import Bar, OrderBook, Quote, CapitalDistribution
 from qtrader.core.utility import try_parsing_datetime
+from qtrader.core.utility import parse_datetime_str
+from qtrader.core.utility import ttl_cache
 from qtrader.core.utility import get_kline_dfield_from_seconds
 from qtrader_config import GATEWAYS, DATA_PATH, TIME_STEP
 from qtrader.gateways import BaseGateway
@@ -333,6 +335,7 @@ class FutuGateway(BaseGateway):
     def unsubscribe(self):
         pass
 
+    @ttl_cache(ttl=0.5)
     def get_recent_bar(self, security: Stock) -> Bar:
         """Get recent OHLCV"""
         # Subscribed kline is set in config
@@ -344,8 +347,7 @@ class FutuGateway(BaseGateway):
             return
         bars = []
         for i in range(data.shape[0]):
-            bar_time = datetime.strptime(
-                data.loc[i, "time_key"], "%Y-%m-%d %H:%M:%S")
+            bar_time = parse_datetime_str(data.loc[i, "time_key"])
             bar = Bar(
                 datetime=bar_time,
                 security=security,
@@ -360,6 +362,7 @@ class FutuGateway(BaseGateway):
         )
         return bars[0]
 
+    @ttl_cache(ttl=0.5)
     def get_recent_capital_distribution(
             self,
             security: Stock
@@ -371,9 +374,7 @@ class FutuGateway(BaseGateway):
                   f" failed: {data}")
             return
         cap_dist = CapitalDistribution(
-            datetime=datetime.strptime(
-                data["update_time"].values[0],
-                "%Y-%m-%d %H:%M:%S"),
+            datetime=parse_datetime_str(data["update_time"].values[0]),
             security=security,
             capital_in_big=data["capital_in_big"].values[0],
             capital_in_mid=data["capital_in_mid"].values[0],
@@ -388,7 +389,10 @@ class FutuGateway(BaseGateway):
             security: Stock,
             **kwargs
     ) -> Dict or Bar or CapitalDistribution:
-        """Get recent data (OHLCV or CapitalDistribution)"""
+        """Get recent data (OHLCV or CapitalDistribution); pass
+        `use_cache=False` to by-pass the short-lived cache and request fresh
+        data from Futu"""
+        use_cache = kwargs.pop("use_cache", True)
         if kwargs:
             assert "dfield" in kwargs, (
                 f"`dfield` should be passed in as kwargs, but kwargs={kwargs}"
@@ -399,9 +403,11 @@ class FutuGateway(BaseGateway):
         data = dict()
         for dfield in dfields:
             if dfield == "kline":
-                data[dfield] = self.get_recent_bar(security)
+                data[dfield] = self.get_recent_bar(
+                    security, use_cache=use_cache)
             elif dfield == "capdist":
-                data[dfield] = self.get_recent_capital_distribution(security)
+                data[dfield] = self.get_recent_capital_distribution(
+                    security, use_cache=use_cache)
         if len(dfields) == 1:
             return data[dfield]
         return data
@@ -516,24 +522,30 @@ class FutuGateway(BaseGateway):
             return
         positions = []
 
+        # Index securities by code once, instead of scanning them per row
+        # (the first security wins if codes are duplicated, same as
+        # `get_security`)
+        securities = {}
+        for s in self.securities:
+            securities.setdefault(s.code, s)
         # Handle HK contracts with specified month
         p = re.compile("HK\.[A-Z]{3,5}[0-9]{4}")
-        for idx, row in data.iterrows():
-            code = row["code"]
-            if p.match(row["code"]):
-                code = row["code"][:-4] + "main"
-            security = self.get_security(code=code)
+        for row in data.itertuples(index=False):
+            code = row.code
+            if p.match(row.code):
+                code = row.code[:-4] + "main"
+            security = securities.get(code)
             if security is None:
                 security = Security(
-                    code=row["code"],
-                    security_name=row["stock_name"])
+                    code=row.code,
+                    security_name=row.stock_name)
             position_data = PositionData(
                 security=security,
                 direction=(Direction.LONG
-                           if row["position_side"] == "LONG"
+                           if row.position_side == "LONG"
                            else Direction.SHORT),
-                holding_price=row["cost_price"],
-                quantity=row["qty"],
+                holding_price=row.cost_price,
+                quantity=row.qty,
                 update_time=datetime.now())
             positions.append(position_data)
         return positions
@@ -574,15 +586,15 @@ class FutuGateway(BaseGateway):
             freq=freq)
 
         hist_bars = []
-        for _, row in data_df.iterrows():
+        for row in data_df.itertuples(index=False):
             bar = Bar(
-                datetime=try_parsing_datetime(row["time_key"]),
+                datetime=try_parsing_datetime(row.time_key),
                 security=security,
-                open=row["open"],
-                high=row["high"],
-                low=row["low"],
-                close=row["close"],
-                volume=row["volume"]
+                open=row.open,
+                high=row.high,
+                low=row.low,
+                close=row.close,
+                volume=row.volume
             )
             hist_bars.append(bar)
         return hist_bars
@@ -594,7 +606,7 @@ class FutuGateway(BaseGateway):
             end: str,
             ktype: KLType = KLType.K_DAY,
             autype: AuType = AuType.QFQ,
-            fields: List[KL_FIELD] = [KL_FIELD.ALL],
+            fields: List[KL_FIELD] = None,
             max_count: int = 500,
             extended_time: bool = False
     ):
@@ -619,6 +631,8 @@ class FutuGateway(BaseGateway):
         :param extended_time: False
         :return:
         """
+        if fields is None:
+            fields = [KL_FIELD.ALL]
         ret, data, page_req_key = self.quote_ctx.request_history_kline(
             code=code,
             start=start,
@@ -749,13 +763,17 @@ class FutuFuturesGateway(FutuGateway):
         self.connect_trade()
 
 
+_DIRECTION_QT2FUTU = {
+    Direction.SHORT: TrdSide.SELL,
+    Direction.LONG: TrdSide.BUY,
+}
+
+
 def convert_direction_qt2futu(direction: Direction) -> TrdSide:
     """Convert QT direction to Futu"""
-    if direction == Direction.SHORT:
-        return TrdSide.SELL
-    elif direction == Direction.LONG:
-        return TrdSide.BUY
-    else:
+    try:
+        return _DIRECTION_QT2FUTU[direction]
+    except KeyError:
         raise ValueError(f"Direction {direction} is not supported.")
 
 
@@ -769,33 +787,30 @@ def convert_trade_mode_qt2futu(trade_mode: TradeMode) -> TrdEnv:
         raise ValueError(f"TradeMode {trade_mode} is not supported.")
 
 
+_ORDERSTATUS_FUTU2QT = {
+    OrderStatus.NONE: QTOrderStatus.UNKNOWN,
+    OrderStatus.UNSUBMITTED: QTOrderStatus.UNKNOWN,
+    OrderStatus.WAITING_SUBMIT: QTOrderStatus.UNKNOWN,
+    OrderStatus.SUBMITTING: QTOrderStatus.UNKNOWN,
+    OrderStatus.DISABLED: QTOrderStatus.UNKNOWN,
+    OrderStatus.DELETED: QTOrderStatus.UNKNOWN,
+    OrderStatus.SUBMITTED: QTOrderStatus.SUBMITTED,
+    OrderStatus.FILLED_ALL: QTOrderStatus.FILLED,
+    OrderStatus.FILLED_PART: QTOrderStatus.PART_FILLED,
+    OrderStatus.CANCELLED_ALL: QTOrderStatus.CANCELLED,
+    OrderStatus.CANCELLED_PART: QTOrderStatus.CANCELLED,
+    OrderStatus.CANCELLING_PART: QTOrderStatus.CANCELLED,
+    OrderStatus.SUBMIT_FAILED: QTOrderStatus.FAILED,
+    OrderStatus.TIMEOUT: QTOrderStatus.FAILED,
+    OrderStatus.FAILED: QTOrderStatus.FAILED,
+}
+
+
 def convert_orderstatus_futu2qt(status: OrderStatus) -> QTOrderStatus:
     """Convert order status to Futu"""
-    if status in (
-            OrderStatus.NONE,
-            OrderStatus.UNSUBMITTED,
-            OrderStatus.WAITING_SUBMIT,
-            OrderStatus.SUBMITTING,
-            OrderStatus.DISABLED,
-            OrderStatus.DELETED):
-        return QTOrderStatus.UNKNOWN
-    elif status in (OrderStatus.SUBMITTED):
-        return QTOrderStatus.SUBMITTED
-    elif status in (OrderStatus.FILLED_ALL):
-        return QTOrderStatus.FILLED
-    elif status in (OrderStatus.FILLED_PART):
-        return QTOrderStatus.PART_FILLED
-    elif status in (
-            OrderStatus.CANCELLED_ALL,
-            OrderStatus.CANCELLED_PART,
-            OrderStatus.CANCELLING_PART):
-        return QTOrderStatus.CANCELLED
-    elif status in (
-            OrderStatus.SUBMIT_FAILED,
-            OrderStatus.TIMEOUT,
-            OrderStatus.FAILED):
-        return QTOrderStatus.FAILED
-    else:
+    try:
+        return _ORDERSTATUS_FUTU2QT[status]
+    except KeyError:
         raise ValueError(f"Order status {status} is not recognized.")
 
 def get_hk_futures_code(security: Futures) -> str:
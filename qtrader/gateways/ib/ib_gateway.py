@@ -915,7 +915,10 @@ class IbGateway(BaseGateway):
             security: Security,
             **kwargs
     ) -> Dict or Bar or CapitalDistribution:
-        """Get recent data (OHLCV or CapitalDistributions)"""
+        """Get recent data (OHLCV or CapitalDistributions); `use_cache` is
+        accepted (and ignored, as nothing is cached here) for compatibility
+        with FutuGateway"""
+        kwargs.pop("use_cache", None)
         if kwargs:
             assert "dfield" in kwargs, (
                 f"`dfield` should be passed in as kwargs, but kwargs={kwargs}"
@@ -1207,43 +1210,51 @@ def generate_ib_contract(security: Security) -> Contract:
     return ib_contract
 
 
+_ORDER_DIRECTION_QT2IB = {
+    Direction.LONG: "BUY",
+    Direction.SHORT: "SELL",
+}
+
+_ORDER_TYPE_QT2IB = {
+    OrderType.MARKET: "MKT",
+    OrderType.LIMIT: "LMT",
+    OrderType.STOP: "STP",
+}
+
+# No partial filled in IB
+# Ref: https://interactivebrokers.github.io/tws-api/order_submission.html
+_ORDERSTATUS_IB2QT = {
+    "PendingCancel": QTOrderStatus.UNKNOWN,
+    "ApiCancelled": QTOrderStatus.UNKNOWN,
+    "ApiPending": QTOrderStatus.SUBMITTING,
+    "PendingSubmit": QTOrderStatus.SUBMITTING,
+    "PreSubmitted": QTOrderStatus.SUBMITTING,
+    "Submitted": QTOrderStatus.SUBMITTED,
+    "Cancelled": QTOrderStatus.CANCELLED,
+    "Filled": QTOrderStatus.FILLED,
+    "Inactive": QTOrderStatus.FAILED,
+}
+
+
 def order_direction_qt2ib(direction: Direction):
-    if direction == Direction.LONG:
-        return "BUY"
-    elif direction == Direction.SHORT:
-        return "SELL"
-    else:
+    try:
+        return _ORDER_DIRECTION_QT2IB[direction]
+    except KeyError:
         raise ValueError(f"Direction {direction} is not supported in IB!")
 
 
 def order_type_qt2ib(order_type: OrderType):
-    if order_type == OrderType.MARKET:
-        return "MKT"
-    elif order_type == OrderType.LIMIT:
-        return "LMT"
-    elif order_type == OrderType.STOP:
-        return "STP"
-    else:
+    try:
+        return _ORDER_TYPE_QT2IB[order_type]
+    except KeyError:
         raise ValueError(f"OrderType {order_type} is not supported in IB!")
 
 
 def convert_orderstatus_ib2qt(status: str) -> QTOrderStatus:
     """Convert IB order status to QT"""
-    # No partial filled in IB
-    # Ref: https://interactivebrokers.github.io/tws-api/order_submission.html
-    if status in ("PendingCancel", "ApiCancelled"):
-        return QTOrderStatus.UNKNOWN
-    if status in ("ApiPending", "PendingSubmit", "PreSubmitted"):
-        return QTOrderStatus.SUBMITTING
-    elif status in ("Submitted"):
-        return QTOrderStatus.SUBMITTED
-    elif status in ("Cancelled"):
-        return QTOrderStatus.CANCELLED
-    elif status in ("Filled"):
-        return QTOrderStatus.FILLED
-    elif status in ("Inactive"):
-        return QTOrderStatus.FAILED
-    else:
+    try:
+        return _ORDERSTATUS_IB2QT[status]
+    except KeyError:
         raise ValueError(f"IB Order status {status} can not be recognized.")
 
 
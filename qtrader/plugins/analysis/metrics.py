@@ -14,11 +14,11 @@ You should have received a copy of the JXW license with
 this file. If not, please write to: josephchenhk@gmail.com
 """
 
-from datetime import datetime
-
 import numpy as np
 import pandas as pd
 
+from qtrader.core.utility import parse_datetime_str
+
 
 def convert_time(time_: str) -> str:
     """time_ in the format: %H:%M:%S"""
@@ -37,8 +37,8 @@ def holding_period(time_: pd.Series) -> float:
         x.total_seconds() / 60.
     )
     """
-    begin_dt = datetime.strptime(time_["open_datetime"], "%Y-%m-%d %H:%M:%S")
-    end_dt = datetime.strptime(time_["close_datetime"], "%Y-%m-%d %H:%M:%S")
+    begin_dt = parse_datetime_str(time_["open_datetime"])
+    end_dt = parse_datetime_str(time_["close_datetime"])
     return (end_dt - begin_dt).total_seconds() / 60.
 
 
@@ -298,10 +298,12 @@ class PerformanceCTA:
         avg_loss_trade_pnl = self.loss_trades_df["pnl"].sum() / num_loss_trades
         avg_trade_pnl = total_pnl / num_trades
 
-        self.win_trades_df["date"] = self.win_trades_df["close_datetime"].apply(
-            lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S").date())
-        self.loss_trades_df["date"] = self.loss_trades_df["close_datetime"].apply(
-            lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S").date())
+        self.win_trades_df["date"] = pd.to_datetime(
+            self.win_trades_df["close_datetime"],
+            format="%Y-%m-%d %H:%M:%S").dt.date
+        self.loss_trades_df["date"] = pd.to_datetime(
+            self.loss_trades_df["close_datetime"],
+            format="%Y-%m-%d %H:%M:%S").dt.date
         total_trades_df = pd.concat([self.win_trades_df, self.loss_trades_df])
         daily_pnl_df = total_trades_df.groupby("date").pnl.agg(["sum"])
         num_days = len(df["datetime"].apply(lambda x: x.date()).unique())
@@ -446,9 +448,8 @@ class PerformanceCTA:
             )
 
             df = pd.concat(total_trades)
-            df["date"] = df["close_datetime"].apply(
-                lambda x: datetime.strptime(
-                    x, "%Y-%m-%d %H:%M:%S").date())
+            df["date"] = pd.to_datetime(
+                df["close_datetime"], format="%Y-%m-%d %H:%M:%S").dt.date
             df = df.sort_values(by=['close_datetime'])
 
             df.to_excel(
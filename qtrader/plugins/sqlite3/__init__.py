@@ -15,4 +15,4 @@ You should have received a copy of the JXW license with
 this file. If not, please write to: josephchenhk@gmail.com
 """
 
-from .db import DB
+from .db import DB, DBPool, BatchWriter
@@ -15,10 +15,16 @@ You should have received a copy of the JXW license with
 this file. If not, please write to: josephchenhk@gmail.com
 """
 
+import logging
 import threading
+import queue
 import sqlite3
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Iterable, List, Dict, Union, Any
+from timeit import default_timer as timer
+from typing import (
+    Iterable, Iterator, List, Dict, Tuple, Union, Any, Callable)
 
 import pandas as pd
 import numpy as np
@@ -31,29 +37,57 @@ except BaseException:
         "`sqlite3` is activated, and its path must be specified in "
         "`DB` variable in qtrader_config.py")
 
-lock = threading.Lock()
+# `synchronous=NORMAL` is safe under WAL journaling (a power loss may only
+# roll back the latest commits); live trading may opt into `FULL`.
+db_synchronous = str(DB.get("sqlite3_synchronous", "NORMAL")).upper()
+if db_synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    raise ValueError(
+        f"sqlite3_synchronous={db_synchronous} is invalid! Only OFF, NORMAL, "
+        "FULL or EXTRA is allowed.")
+
+logger = logging.getLogger(__name__)
 
 
 class DB:
 
-    def __init__(self):
-        self.conn = sqlite3.connect(f"{db_path}/qtrader.db")
+    def __init__(self, check_same_thread: bool = True):
+        self.conn = sqlite3.connect(
+            f"{db_path}/qtrader.db",
+            cached_statements=256,
+            check_same_thread=check_same_thread)
+        # serializes use of this connection (and its cursor) across threads
+        self.lock = threading.Lock()
         self.cursor = self.conn.cursor()
+        self.row_cursor = self.conn.cursor()
+        self.row_cursor.row_factory = sqlite3.Row
+        self._stmt_cache: Dict[Tuple, str] = dict()
+        self.set_pragmas()
         self.create_balance_table()
         self.create_position_table()
         self.create_order_table()
         self.create_deal_table()
 
+    def set_pragmas(self):
+        """WAL journaling lets readers work while the persist thread is
+        writing, and saves the double-write of the rollback journal"""
+        self.execute("PRAGMA journal_mode=WAL")
+        self.execute(f"PRAGMA synchronous={db_synchronous}")
+        self.execute("PRAGMA temp_store=MEMORY")
+        self.execute("PRAGMA cache_size=-65536")  # 64MB
+        self.execute("PRAGMA mmap_size=268435456")  # 256MB
+        self.execute("PRAGMA busy_timeout=5000")  # milliseconds
+
     def close(self):
-        with lock:
+        with self.lock:
             self.cursor.close()
+            self.row_cursor.close()
             self.conn.close()
 
     def commit(self):
         self.conn.commit()
 
     def execute(self, sql: str, parameters: Iterable = None):
-        with lock:
+        with self.lock:
             if parameters is None:
                 self.cursor.execute(sql)
                 self.commit()
@@ -61,52 +95,151 @@ class DB:
             self.cursor.execute(sql, parameters)
             self.commit()
 
-    def _parse_sql_value(self, value: Union[str, float, int, datetime]):
-        if isinstance(value, str):
-            return f"\"{value}\""
-        elif (
-            isinstance(value, float)
-            or isinstance(value, int)
-            or isinstance(value, np.int64)
-        ):
-            return f"{value}"
+    def scalar(self, sql: str, parameters: Iterable = ()) -> Any:
+        """Execute a query and return the first column of its first row
+        (None if no row), e.g. aggregations such as
+        `SELECT COALESCE(MAX(broker_account_id),0)+1 FROM balance`"""
+        with self.lock:
+            self.cursor.execute(sql, tuple(parameters))
+            row = self.cursor.fetchone()
+        return None if row is None else row[0]
+
+    def _parse_sql_param(self, value: Union[str, float, int, datetime]):
+        """Convert value to a type that can be bound to a `?` placeholder"""
+        if isinstance(value, (str, float, int)):
+            return value
+        elif isinstance(value, np.integer):
+            return int(value)
+        elif isinstance(value, np.floating):
+            return float(value)
         elif isinstance(value, datetime):
-            return f"\"{value.strftime('%Y-%m-%d %H:%M:%S')}\""
+            return value.strftime('%Y-%m-%d %H:%M:%S')
         else:
             raise ValueError(
                 f"Data format is not support! type({value})={type(value)}")
 
-    def _parse_sql_where_condition(self, **kwargs):
-        sql = ""
-        if len(kwargs) > 0:
-            sql += "WHERE "
-        for idx, (k, v) in enumerate(kwargs.items()):
-            if idx != 0:
-                sql += "AND "
-            if k == "condition_str":  # all non "=" conditions
-                sql += f"{v} "
-            else:
-                sql += f"{k}={self._parse_sql_value(v)} "
+    def _get_statement(self, key: Tuple, build: Callable[[], str]) -> str:
+        """Get the SQL template for `key`, building it on first use.
+
+        Templates only contain `?` placeholders, so the same SQL text is
+        reused across calls and hits sqlite3's compiled statement cache.
+        """
+        sql = self._stmt_cache.get(key)
+        if sql is None:
+            sql = build()
+            self._stmt_cache[key] = sql
         return sql
 
+    def _parse_sql_where_condition(
+            self,
+            condition_params: Iterable = (),
+            **kwargs
+    ) -> Tuple[str, tuple]:
+        """Return WHERE clause (with placeholders) and its parameters;
+        `condition_params` are bound to the `?` placeholders in
+        `condition_str` (if any)"""
+        condition_params = tuple(condition_params)
+        if condition_params and "condition_str" not in kwargs:
+            raise ValueError(
+                f"condition_params={condition_params} are given, but there "
+                "is no condition_str to bind them to!")
+
+        def build():
+            conditions = []
+            for k, v in kwargs.items():
+                if k == "condition_str":  # all non "=" conditions
+                    conditions.append(v)
+                else:
+                    conditions.append(f"{k}=?")
+            if len(conditions) == 0:
+                return ""
+            return "WHERE " + " AND ".join(conditions)
+
+        if "condition_str" in kwargs:
+            # free-form conditions may embed arbitrary values (e.g. ids), so
+            # caching them would grow the cache without ever hitting it
+            sql = build()
+        else:
+            sql = self._get_statement(("WHERE",) + tuple(kwargs), build)
+        params = []
+        for k, v in kwargs.items():
+            if k == "condition_str":
+                params.extend(
+                    self._parse_sql_param(p) for p in condition_params)
+            else:
+                params.append(self._parse_sql_param(v))
+        return sql, tuple(params)
+
     def delete_table(self, table_name: str):
         sql = f"DROP TABLE {table_name}"
         self.execute(sql)
 
+    def _parse_sql_select(
+            self,
+            table_name: str,
+            columns: List[str] = None,
+            condition_params: Iterable = (),
+            **kwargs
+    ) -> Tuple[str, tuple]:
+        columns = "*" if columns is None else ",".join(columns)
+        sql = self._get_statement(
+            ("SELECT", table_name, columns),
+            lambda: f"SELECT {columns} FROM {table_name}")
+        where, params = self._parse_sql_where_condition(
+            condition_params, **kwargs)
+        return f"{sql} {where}", params
+
+    def select_rows(
+            self,
+            table_name: str,
+            columns: List[str] = None,
+            condition_params: Iterable = (),
+            **kwargs
+    ) -> List[sqlite3.Row]:
+        """Same as `select_records`, but return raw rows (accessible by
+        column name, e.g. row["security_code"]) without building a
+        DataFrame; suited to internal paths that iterate rows one by one"""
+        sql, params = self._parse_sql_select(
+            table_name, columns, condition_params, **kwargs)
+        with self.lock:
+            self.row_cursor.execute(sql, params)
+            return self.row_cursor.fetchall()
+
     def select_records(
             self,
             table_name: str,
             columns: List[str] = None,
+            condition_params: Iterable = (),
             **kwargs
     ):
-        if columns is None:
-            columns = "*"
-        else:
-            columns = ",".join(columns)
-        sql = f"SELECT {columns} FROM {table_name} "
-        sql += self._parse_sql_where_condition(**kwargs)
-        self.execute(sql)
-        with lock:
+        sql, params = self._parse_sql_select(
+            table_name, columns, condition_params, **kwargs)
+        with self.lock:
+            self.cursor.execute(sql, params)
+            data = self.cursor.fetchall()
+            return pd.DataFrame(
+                data,
+                columns=[d[0] for d in self.cursor.description])
+
+    def select_broker_positions(
+            self,
+            broker_name: str,
+            broker_environment: str,
+            broker_account: str
+    ) -> pd.DataFrame:
+        """Positions of all strategy accounts under a broker account, joined
+        with `strategy_account` and `strategy_version` of their balances (one
+        query instead of selecting balance ids and then their positions)"""
+        sql = self._get_statement(
+            ("SELECT_BROKER_POSITIONS",),
+            lambda: (
+                "SELECT p.*, b.strategy_account, b.strategy_version "
+                "FROM position p JOIN balance b ON p.balance_id=b.id "
+                "WHERE b.broker_name=? AND b.broker_environment=? "
+                "AND b.broker_account=?"))
+        params = (broker_name, broker_environment, broker_account)
+        with self.lock:
+            self.cursor.execute(sql, params)
             data = self.cursor.fetchall()
             return pd.DataFrame(
                 data,
@@ -116,34 +249,92 @@ class DB:
             self,
             table_name: str,
             columns: Dict[str, Any],
+            condition_params: Iterable = (),
             **kwargs
     ):
         assert len(columns) > 0, "At least one column needs to be updated!"
-        sql = f"UPDATE {table_name} "
-        for idx, (k, v) in enumerate(columns.items()):
-            if idx == 0:
-                sql += "SET "
-            sql += f"{k}={self._parse_sql_value(v)} "
-            if idx != len(columns) - 1:
-                sql += ","
-        sql += self._parse_sql_where_condition(**kwargs)
-        self.execute(sql)
+        sql = self._get_statement(
+            ("UPDATE", table_name, tuple(columns)),
+            lambda: (f"UPDATE {table_name} SET "
+                     + ",".join(f"{k}=?" for k in columns)))
+        where, params = self._parse_sql_where_condition(
+            condition_params, **kwargs)
+        params = tuple(
+            self._parse_sql_param(v) for v in columns.values()) + params
+        self.execute(f"{sql} {where}", params)
+
+    def _get_insert_statement(self, table_name: str, columns: Tuple[str]):
+        return self._get_statement(
+            ("INSERT", table_name, columns),
+            lambda: (f"INSERT INTO {table_name} ({','.join(columns)}) "
+                     f"VALUES ({','.join(['?'] * len(columns))})"))
 
     def insert_records(self, table_name: str, **kwargs):
         assert len(kwargs) > 0, (
             "Must provide columns and values when inserting!"
         )
-        sql = f"INSERT INTO {table_name} ("
-        sql += ",".join(kwargs.keys())
-        sql += ") VALUES ("
-        sql += ",".join([self._parse_sql_value(v) for v in kwargs.values()])
-        sql += ")"
-        self.execute(sql)
+        sql = self._get_insert_statement(table_name, tuple(kwargs))
+        self.execute(
+            sql, tuple(self._parse_sql_param(v) for v in kwargs.values()))
 
-    def delete_records(self, table_name: str, **kwargs):
-        sql = (f"DELETE FROM {table_name} "
-               f"{self._parse_sql_where_condition(**kwargs)}")
-        self.execute(sql)
+    def _insert_many(self, table_name: str, rows: List[Dict[str, Any]]):
+        """Insert rows with one `executemany` (caller manages the
+        transaction)"""
+        columns = tuple(rows[0].keys())
+        for row in rows:
+            if set(row.keys()) != set(columns):
+                raise ValueError(
+                    f"All rows inserted into {table_name} must have the same "
+                    f"columns, but got {tuple(row.keys())} and {columns}!")
+        sql = self._get_insert_statement(table_name, columns)
+        self.cursor.executemany(
+            sql,
+            [tuple(self._parse_sql_param(row[c]) for c in columns)
+             for row in rows])
+
+    def insert_many(self, table_name: str, rows: List[Dict[str, Any]]):
+        """Insert multiple records in a single transaction"""
+        self.insert_batches([(table_name, rows)])
+
+    def insert_batches(
+            self,
+            batches: Iterable[Tuple[str, List[Dict[str, Any]]]]
+    ):
+        """Insert batches of records, given as (table_name, rows), possibly
+        into different tables, in a single transaction"""
+        batches = [(t, rows) for t, rows in batches if len(rows) > 0]
+        if len(batches) == 0:
+            return
+        with self.lock:
+            with self.conn:
+                for table_name, rows in batches:
+                    self._insert_many(table_name, rows)
+
+    def replace_records(
+            self,
+            table_name: str,
+            rows: List[Dict[str, Any]],
+            **kwargs
+    ):
+        """Delete records that match the conditions in kwargs and insert the
+        new rows, in a single transaction (either both or none of them
+        take effect)"""
+        where, params = self._parse_sql_where_condition(**kwargs)
+        with self.lock:
+            with self.conn:
+                self.cursor.execute(f"DELETE FROM {table_name} {where}", params)
+                if len(rows) > 0:
+                    self._insert_many(table_name, rows)
+
+    def delete_records(
+            self,
+            table_name: str,
+            condition_params: Iterable = (),
+            **kwargs
+    ):
+        where, params = self._parse_sql_where_condition(
+            condition_params, **kwargs)
+        self.execute(f"DELETE FROM {table_name} {where}", params)
 
     def create_balance_table(self):
         sql = (
@@ -170,6 +361,24 @@ class DB:
             "remark VARCHAR(300))"
         )
         self.execute(sql)
+        sql = (
+            "CREATE INDEX IF NOT EXISTS idx_balance_ids "
+            "ON balance(broker_account_id, strategy_account_id)"
+        )
+        self.execute(sql)
+        # MAX(strategy_account_id) can not use idx_balance_ids (where it is
+        # the second column), so it gets an index of its own
+        sql = (
+            "CREATE INDEX IF NOT EXISTS idx_balance_strategy_account_id "
+            "ON balance(strategy_account_id)"
+        )
+        self.execute(sql)
+        sql = (
+            "CREATE INDEX IF NOT EXISTS idx_balance_lookup "
+            "ON balance(broker_name, broker_environment, broker_account, "
+            "strategy_account, strategy_version)"
+        )
+        self.execute(sql)
 
     def create_position_table(self):
         sql = (
@@ -185,6 +394,11 @@ class DB:
             "remark VARCHAR(300))"
         )
         self.execute(sql)
+        sql = (
+            "CREATE INDEX IF NOT EXISTS idx_position_balance "
+            "ON position(balance_id)"
+        )
+        self.execute(sql)
 
     def create_order_table(self):
         sql = (
@@ -229,6 +443,154 @@ class DB:
         self.execute(sql)
 
 
+class DBPool:
+    """A fixed-size pool of DB connections.
+
+    With WAL journaling, readers on different connections neither block
+    each other nor the writer, so threads sharing a pool do not serialize
+    on a single connection. A thread that only writes (e.g. persisting
+    data) is better served by a dedicated `DB` or `BatchWriter`.
+    """
+
+    def __init__(self, size: int = 4):
+        self._pool = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._pool.put(DB(check_same_thread=False))
+
+    @contextmanager
+    def connection(self) -> Iterator[DB]:
+        """Borrow a connection, e.g.
+        `with pool.connection() as db: db.select_records(...)`"""
+        db = self._pool.get()
+        if db is None:
+            # the pool is closed; pass the sentinel on to the next waiter
+            self._pool.put(None)
+            raise RuntimeError("DBPool is closed.")
+        try:
+            yield db
+        finally:
+            with self._lock:
+                if self._closed:
+                    # the pool was closed while the connection was borrowed
+                    db.close()
+                else:
+                    self._pool.put(db)
+
+    def close(self):
+        """Close idle connections now; connections still borrowed are
+        closed when they are returned, and threads waiting for a connection
+        get a RuntimeError"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            while True:
+                try:
+                    db = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                db.close()
+            self._pool.put(None)
+
+
+class BatchWriter:
+    """Insert records into DB asynchronously.
+
+    Producers put records onto a queue; a consumer thread (with its own
+    connection) drains it and commits whatever has arrived in one
+    transaction, as soon as `batch_size` records are queued or
+    `flush_interval` seconds have passed, whichever comes first.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._active = threading.Event()
+        self._active.set()
+        self._put_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, table_name: str, **kwargs):
+        """Queue a record to be inserted into `table_name`"""
+        assert len(kwargs) > 0, (
+            "Must provide columns and values when inserting!"
+        )
+        with self._put_lock:
+            if not self._active.is_set():
+                raise RuntimeError(
+                    "BatchWriter has been stopped, records can no longer "
+                    "be put into it.")
+            self._queue.put((table_name, kwargs))
+
+    def stop(self):
+        """Flush all queued records and stop the consumer thread"""
+        with self._put_lock:
+            self._active.clear()
+        self._thread.join()
+
+    def _run(self):
+        # sqlite3 connections can only be used in the thread creating them
+        try:
+            db = DB()
+        except Exception:
+            logger.exception("[BatchWriter] Failed to connect to DB.")
+            with self._put_lock:
+                self._active.clear()
+            return
+        while self._active.is_set() or not self._queue.empty():
+            items = self._get_batch()
+            if items:
+                self._flush(db, items)
+        db.close()
+
+    def _get_batch(self) -> List[Tuple[str, Dict[str, Any]]]:
+        items = []
+        deadline = timer() + self.flush_interval
+        while len(items) < self.batch_size:
+            timeout = deadline - timer()
+            if timeout <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return items
+
+    @staticmethod
+    def _flush(db: DB, items: List[Tuple[str, Dict[str, Any]]]):
+        # group records by table and columns, so that each group can be
+        # written with one executemany
+        batches = defaultdict(list)
+        for table_name, record in items:
+            batches[(table_name, tuple(record))].append(record)
+        batches = [(t, rows) for (t, _), rows in batches.items()]
+        try:
+            db.insert_batches(batches)
+            return
+        except Exception:
+            # the transaction has been rolled back; retry group by group,
+            # and record by record within a failing group, so that only the
+            # bad records are lost
+            pass
+        for table_name, rows in batches:
+            try:
+                db.insert_many(table_name, rows)
+                continue
+            except Exception:
+                pass
+            for row in rows:
+                try:
+                    db.insert_records(table_name, **row)
+                except Exception:
+                    logger.exception(
+                        f"[BatchWriter] Failed to insert record {row} into "
+                        f"{table_name}.")
+
+
 if __name__ == "__main__":
     db = DB()
     # db.delete_records(table_name="balance")
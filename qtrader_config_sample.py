@@ -76,7 +76,8 @@ DATA_MODEL = {
 }
 
 DB = {
-    "sqlite3": "/Users/qtrader/data"
+    "sqlite3": "/Users/qtrader/data",
+    "sqlite3_synchronous": "NORMAL",  # "FULL" for extra durability
 }
 
 CLICKHOUSE = {
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# @FileName: sqlite3_db_test.py
+
+"""
+Copyright (C) 2020 Joseph Chen - All Rights Reserved
+You may use, distribute and modify this code under the
+terms of the JXW license, which unfortunately won't be
+written for another century.
+
+You should have received a copy of the JXW license with
+this file. If not, please write to: josephchenhk@gmail.com
+"""
+import threading
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import qtrader.plugins.sqlite3.db as sqlite3_db
+from qtrader.plugins.sqlite3.db import DB, DBPool, BatchWriter
+
+
+@pytest.fixture(autouse=True)
+def db_path(tmp_path, monkeypatch):
+    """Point `DB["sqlite3"]` to a temporary directory"""
+    monkeypatch.setattr(sqlite3_db, "db_path", str(tmp_path))
+    return tmp_path
+
+
+def position_record(**kwargs):
+    record = dict(
+        balance_id=1,
+        security_name="HK.00700",
+        security_code="HK.00700",
+        direction="LONG",
+        holding_price=300.0,
+        quantity=100,
+        update_time=datetime(2023, 1, 3, 9, 30))
+    record.update(kwargs)
+    return record
+
+
+class TestDB:
+
+    def test_insert_select_records(self):
+        db = DB()
+        db.insert_records("position", **position_record(
+            holding_price=np.float64(301.5), quantity=np.int64(200)))
+        df = db.select_records("position", security_code="HK.00700")
+        assert len(df) == 1
+        assert df["holding_price"].iloc[0] == 301.5
+        assert df["quantity"].iloc[0] == 200
+        assert df["update_time"].iloc[0] == "2023-01-03 09:30:00"
+
+    def test_update_records(self):
+        db = DB()
+        db.insert_records("position", **position_record())
+        db.insert_records("position", **position_record(
+            security_code="HK.09988"))
+        db.update_records(
+            "position",
+            columns={"quantity": np.int64(50), "holding_price": 310.0},
+            security_code="HK.00700")
+        df = db.select_records(
+            "position", columns=["security_code", "quantity"])
+        quantities = dict(zip(df["security_code"], df["quantity"]))
+        assert quantities == {"HK.00700": 50, "HK.09988": 100}
+
+    def test_delete_records(self):
+        db = DB()
+        db.insert_records("position", **position_record())
+        db.insert_records("position", **position_record(balance_id=2))
+        db.delete_records("position", balance_id=np.int64(1))
+        df = db.select_records("position")
+        assert df["balance_id"].tolist() == [2]
+
+    def test_condition_str_before_kwargs(self):
+        db = DB()
+        for quantity in (100, 200, 300):
+            db.insert_records("position", **position_record(
+                quantity=quantity))
+        db.insert_records("position", **position_record(
+            balance_id=2, quantity=300))
+        df = db.select_records(
+            "position",
+            condition_params=(np.int64(150),),
+            condition_str="quantity>?",
+            balance_id=1)
+        assert sorted(df["quantity"]) == [200, 300]
+
+    def test_condition_str_after_kwargs(self):
+        db = DB()
+        for quantity in (100, 200, 300):
+            db.insert_records("position", **position_record(
+                quantity=quantity))
+        db.update_records(
+            "position",
+            columns={"direction": "SHORT"},
+            condition_params=(150, 250),
+            balance_id=1,
+            condition_str="quantity>? AND quantity<?")
+        df = db.select_records("position", direction="SHORT")
+        assert df["quantity"].tolist() == [200]
+        db.delete_records(
+            "position",
+            condition_params=(np.float64(250.0),),
+            security_code="HK.00700",
+            condition_str="quantity>?")
+        df = db.select_records("position")
+        assert sorted(df["quantity"]) == [100, 200]
+
+    def test_condition_params_without_condition_str(self):
+        db = DB()
+        with pytest.raises(ValueError):
+            db.select_records("position", condition_params=(1,))
+
+
+class TestDBPool:
+
+    def test_connection_after_close(self):
+        pool = DBPool(size=1)
+        pool.close()
+        with pytest.raises(RuntimeError):
+            with pool.connection():
+                pass
+
+    def test_close_borrowed_connection_on_return(self):
+        pool = DBPool(size=1)
+        with pool.connection() as db:
+            pool.close()
+        with pytest.raises(Exception):
+            db.conn.execute("SELECT 1")
+
+    def test_close_wakes_waiting_thread(self):
+        pool = DBPool(size=1)
+        borrowed = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def hold():
+            with pool.connection():
+                borrowed.set()
+                release.wait()
+
+        def wait():
+            try:
+                with pool.connection():
+                    pass
+            except RuntimeError as e:
+                errors.append(e)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        borrowed.wait()
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        pool.close()
+        release.set()
+        holder.join(timeout=5)
+        waiter.join(timeout=5)
+        assert not waiter.is_alive()
+        assert len(errors) == 1
+
+
+class TestBatchWriter:
+
+    def test_bad_record_only_loses_itself(self):
+        writer = BatchWriter(batch_size=10, flush_interval=0.1)
+        writer.put("position", **position_record(security_code="HK.1"))
+        # can not be bound to a placeholder
+        writer.put("position", **position_record(quantity=[1]))
+        writer.put("position", **position_record(security_code="HK.2"))
+        writer.put("trading_order", no_such_column=1)
+        writer.stop()
+        assert not writer._thread.is_alive()
+        df = DB().select_records("position", columns=["security_code"])
+        assert sorted(df["security_code"]) == ["HK.1", "HK.2"]
+
+    def test_put_after_stop(self):
+        writer = BatchWriter()
+        writer.stop()
+        with pytest.raises(RuntimeError):
+            writer.put("position", **position_record())